@@ -60,6 +60,10 @@ def main(*args):
                         default. The output SCC scores will be ordered as the\
                         chromosomes in the input Cooler files by removing those\
                         chromosomes provided here")
+    parser.add_argument("--nproc", type=int, default=1,
+                        help="Number of worker processes used to compute the\
+                        SCC scores of different chromosomes in parallel.\
+                        Default to 1, which uses a single process")
 
     args = parser.parse_args()
 
@@ -93,6 +97,7 @@ def main(*args):
     bDownSample = args.bDownSample
     chrNames = args.chrNames
     excludeChr = set(args.excludeChr)
+    nproc = args.nproc
 
     if len(excludeChr) != len(args.excludeChr):
         warnings.warn(f"""
@@ -103,6 +108,7 @@ def main(*args):
 
     scc = hicrepSCC(cool1, cool2, h, dBPMax, bDownSample,
                     chrNames if len(chrNames) > 0 else None,
-                    excludeChr if len(excludeChr) > 0 else None)
+                    excludeChr if len(excludeChr) > 0 else None,
+                    nproc)
 
     np.savetxt(fout, scc, "%30.15e", header=header)
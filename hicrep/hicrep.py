@@ -14,6 +14,7 @@
 #
 # Distributed under terms of the GNU General Public License v3.0.
 import os
+from concurrent.futures import ProcessPoolExecutor
 from deprecated import deprecated
 import numpy as np
 import scipy.sparse as sp
@@ -26,6 +27,11 @@ from hicrep.utils import (
     trimDiags, meanFilterSparse, varVstran,
     resample, upperDiagCsr, coolerInfo
     )
+try:
+    from numba import njit, prange
+    hasNumba = True
+except ImportError:
+    hasNumba = False
 
 @deprecated("Use sccByDiag instead")
 def sccOfDiag(diag1: np.ndarray, diag2: np.ndarray):
@@ -54,6 +60,64 @@ def sccOfDiag(diag1: np.ndarray, diag2: np.ndarray):
         return (np.nan, np.nan)
     return (rho, ws)
 
+if hasNumba:
+    @njit(parallel=True, cache=True, fastmath=True)
+    def _sccByDiagNumba(indptr1, indices1, data1, indptr2, indices2, data2, n):
+        """Compute the row-wise sums, sums of squares, sum of products and
+        number of non-zero entries in the union of two csr_matrix in one pass
+
+        Args:
+            indptr1, indices1, data1: CSR arrays of input matrix 1
+            indptr2, indices2, data2: CSR arrays of input matrix 2, which must
+            have the same column indices sort order as input matrix 1
+            n (int): number of rows of the input matrices
+        Returns: tuple of 6 `np.ndarray` of length n holding the row-wise sum
+        of matrix 1, sum of matrix 2, sum of squares of matrix 1, sum of squares
+        of matrix 2, sum of products and number of entries non-zero in either
+        """
+        s1 = np.zeros(n)
+        s2 = np.zeros(n)
+        s11 = np.zeros(n)
+        s22 = np.zeros(n)
+        s12 = np.zeros(n)
+        nnz = np.zeros(n)
+        for i in prange(n):
+            p1, e1 = indptr1[i], indptr1[i + 1]
+            p2, e2 = indptr2[i], indptr2[i + 1]
+            a1 = a2 = a11 = a22 = a12 = 0.0
+            k = 0
+            # two-pointer merge of the column indices of row i, treating
+            # entries missing from one of the matrices as 0
+            while p1 < e1 or p2 < e2:
+                if p2 == e2 or (p1 < e1 and indices1[p1] < indices2[p2]):
+                    x = data1[p1]
+                    a1 += x
+                    a11 += x * x
+                    p1 += 1
+                elif p1 == e1 or indices2[p2] < indices1[p1]:
+                    y = data2[p2]
+                    a2 += y
+                    a22 += y * y
+                    p2 += 1
+                else:
+                    x = data1[p1]
+                    y = data2[p2]
+                    a1 += x
+                    a11 += x * x
+                    a2 += y
+                    a22 += y * y
+                    a12 += x * y
+                    p1 += 1
+                    p2 += 1
+                k += 1
+            s1[i] = a1
+            s2[i] = a2
+            s11[i] = a11
+            s22[i] = a22
+            s12[i] = a12
+            nnz[i] = k
+        return s1, s2, s11, s22, s12, nnz
+
 def sccByDiag(m1: sp.coo_matrix, m2: sp.coo_matrix, nDiags: int):
     """Compute diagonal-wise hicrep SCC score for the two input matrices up to
     nDiags diagonals
@@ -70,16 +134,27 @@ def sccByDiag(m1: sp.coo_matrix, m2: sp.coo_matrix, nDiags: int):
     # diagonal-wise correlation between m1 and m2
     m1D = upperDiagCsr(m1, nDiags)
     m2D = upperDiagCsr(m2, nDiags)
-    nSamplesD = (m1D + m2D).getnnz(axis=1)
-    rowSumM1D = m1D.sum(axis=1).A1
-    rowSumM2D = m2D.sum(axis=1).A1
+    if hasNumba:
+        # the merge in _sccByDiagNumba requires sorted column indices
+        m1D.sort_indices()
+        m2D.sort_indices()
+        rowSumM1D, rowSumM2D, rowSumSqM1D, rowSumSqM2D, rowSumM1DM2D, nSamplesD = \
+            _sccByDiagNumba(m1D.indptr, m1D.indices, m1D.data,
+                            m2D.indptr, m2D.indices, m2D.data, m1D.shape[0])
+    else:
+        nSamplesD = (m1D + m2D).getnnz(axis=1)
+        rowSumM1D = m1D.sum(axis=1).A1
+        rowSumM2D = m2D.sum(axis=1).A1
+        rowSumSqM1D = m1D.power(2).sum(axis=1).A1
+        rowSumSqM2D = m2D.power(2).sum(axis=1).A1
+        rowSumM1DM2D = m1D.multiply(m2D).sum(axis=1).A1
     # ignore zero-division warnings because the corresponding elements in the
     # output don't contribute to the SCC scores
     with np.errstate(divide='ignore', invalid='ignore'):
-        cov = m1D.multiply(m2D).sum(axis=1).A1 - rowSumM1D * rowSumM2D / nSamplesD
+        cov = rowSumM1DM2D - rowSumM1D * rowSumM2D / nSamplesD
         rhoD = cov / np.sqrt(
-            (m1D.power(2).sum(axis=1).A1 - np.square(rowSumM1D) / nSamplesD ) *
-            (m2D.power(2).sum(axis=1).A1 - np.square(rowSumM2D) / nSamplesD ))
+            (rowSumSqM1D - np.square(rowSumM1D) / nSamplesD ) *
+            (rowSumSqM2D - np.square(rowSumM2D) / nSamplesD ))
         wsD = nSamplesD * varVstran(nSamplesD)
         # Convert NaN and Inf resulting from div by 0 to zeros.
         # posinf and neginf added to fix behavior seen in 4DN datasets
@@ -91,9 +166,65 @@ def sccByDiag(m1: sp.coo_matrix, m2: sp.coo_matrix, nDiags: int):
     return rhoNan2Zero @ wsNan2Zero / wsNan2Zero.sum()
 
 
+def _sccOneChrom(args: tuple):
+    """Compute the hicrep SCC score of a single chromosome. This is the unit of
+    work dispatched to the worker processes by `hicrepSCC`
+
+    Args:
+        args: `tuple` of (uri1, uri2, chrName, h, dMax, bDownSample, n1, n2)
+        where uri1 and uri2 are the Cooler URIs of the two inputs, n1 and n2
+        are their total number of contacts and the rest are the same as in
+        `hicrepSCC`
+
+    Returns:
+        `float` scc score of the chromosome
+    """
+    uri1, uri2, chrName, h, dMax, bDownSample, n1, n2 = args
+    # re-open the inputs here because h5py file handles can't be shared
+    # between processes
+    cool1 = cooler.Cooler(uri1)
+    cool2 = cooler.Cooler(uri2)
+    # normalize by total number of contacts
+    mS1 = getSubCoo(cool2pixels(cool1), cool1.bins(), chrName)
+    assert mS1.size > 0, "Contact matrix 1 of chromosome %s is empty" % (chrName)
+    assert mS1.shape[0] == mS1.shape[1],\
+        "Contact matrix 1 of chromosome %s is not square" % (chrName)
+    mS2 = getSubCoo(cool2pixels(cool2), cool2.bins(), chrName)
+    assert mS2.size > 0, "Contact matrix 2 of chromosome %s is empty" % (chrName)
+    assert mS2.shape[0] == mS2.shape[1],\
+        "Contact matrix 2 of chromosome %s is not square" % (chrName)
+    assert mS1.shape == mS2.shape,\
+        "Contact matrices of chromosome %s have different input shape" % (chrName)
+    nDiags = mS1.shape[0] if dMax < 0 else min(dMax, mS1.shape[0])
+    # remove major diagonal and all the diagonals >= nDiags
+    # to save computation time
+    m1 = trimDiags(mS1, nDiags, False)
+    m2 = trimDiags(mS2, nDiags, False)
+    del mS1
+    del mS2
+    if bDownSample:
+        # do downsampling
+        size1 = m1.sum()
+        size2 = m2.sum()
+        if size1 > size2:
+            m1 = resample(m1, size2).astype(float)
+        elif size2 > size1:
+            m2 = resample(m2, size1).astype(float)
+    else:
+        # just normalize by total contacts
+        m1 = m1.astype(float) / n1
+        m2 = m2.astype(float) / n2
+    if h > 0:
+        # apply smoothing
+        m1 = meanFilterSparse(m1, h)
+        m2 = meanFilterSparse(m2, h)
+    return sccByDiag(m1, m2, nDiags)
+
+
 def hicrepSCC(cool1: cooler.api.Cooler, cool2: cooler.api.Cooler,
               h: int, dBPMax: int, bDownSample: bool,
-              chrNames: list = None, excludeChr: set = None):
+              chrNames: list = None, excludeChr: set = None,
+              nWorkers: int = 1):
     """Compute hicrep score between two input Cooler contact matrices
 
     Args:
@@ -110,6 +241,12 @@ def hicrepSCC(cool1: cooler.api.Cooler, cool2: cooler.api.Cooler,
         genome are used to compute SCC
         excludeChr: `set` Set of chromosome names to exclude from SCC
         computation. Default to None.
+        nWorkers: `int` Number of worker processes used to compute the SCC
+        scores of different chromosomes in parallel. Default to 1, which
+        computes all chromosomes in the current process. If None, use as
+        many workers as there are CPUs. Note that with bDownSample set the
+        random resampling is done independently in each worker so results
+        differ between serial and parallel runs
 
     Returns:
         `float` scc scores for each chromosome
@@ -146,8 +283,6 @@ def hicrepSCC(cool1: cooler.api.Cooler, cool2: cooler.api.Cooler,
     else:
         dMax = dBPMax // binSize + 1
     assert dMax > 1, f"Input dBPmax is smaller than binSize"
-    p1 = cool2pixels(cool1)
-    p2 = cool2pixels(cool2)
     # get the total number of contacts as normalizing constant
     n1 = coolerInfo(cool1, 'sum')
     n2 = coolerInfo(cool2, 'sum')
@@ -166,43 +301,15 @@ def hicrepSCC(cool1: cooler.api.Cooler, cool2: cooler.api.Cooler,
     if excludeChr is None:
         excludeChr = set()
     chrNames = [ chrName for chrName in chrNamesDict if chrName not in excludeChr ]
-    scc = np.full(len(chrNames), -2.0)
-    for iChr, chrName in enumerate(chrNames):
-        # normalize by total number of contacts
-        mS1 = getSubCoo(p1, bins1, chrName)
-        assert mS1.size > 0, "Contact matrix 1 of chromosome %s is empty" % (chrName)
-        assert mS1.shape[0] == mS1.shape[1],\
-            "Contact matrix 1 of chromosome %s is not square" % (chrName)
-        mS2 = getSubCoo(p2, bins2, chrName)
-        assert mS2.size > 0, "Contact matrix 2 of chromosome %s is empty" % (chrName)
-        assert mS2.shape[0] == mS2.shape[1],\
-            "Contact matrix 2 of chromosome %s is not square" % (chrName)
-        assert mS1.shape == mS2.shape,\
-            "Contact matrices of chromosome %s have different input shape" % (chrName)
-        nDiags = mS1.shape[0] if dMax < 0 else min(dMax, mS1.shape[0])
-        rho = np.full(nDiags, np.nan)
-        ws = np.full(nDiags, np.nan)
-        # remove major diagonal and all the diagonals >= nDiags
-        # to save computation time
-        m1 = trimDiags(mS1, nDiags, False)
-        m2 = trimDiags(mS2, nDiags, False)
-        del mS1
-        del mS2
-        if bDownSample:
-            # do downsampling
-            size1 = m1.sum()
-            size2 = m2.sum()
-            if size1 > size2:
-                m1 = resample(m1, size2).astype(float)
-            elif size2 > size1:
-                m2 = resample(m2, size1).astype(float)
-        else:
-            # just normalize by total contacts
-            m1 = m1.astype(float) / n1
-            m2 = m2.astype(float) / n2
-        if h > 0:
-            # apply smoothing
-            m1 = meanFilterSparse(m1, h)
-            m2 = meanFilterSparse(m2, h)
-        scc[iChr] = sccByDiag(m1, m2, nDiags)
-    return scc
+    tasks = [(cool1.uri, cool2.uri, chrName, h, dMax, bDownSample, n1, n2)
+             for chrName in chrNames]
+    if nWorkers is None:
+        nWorkers = os.cpu_count()
+    if nWorkers > 1 and len(tasks) > 1:
+        # chromosomes are independent of each other and executor.map
+        # preserves the order of the input chrNames in the output
+        with ProcessPoolExecutor(max_workers=nWorkers) as executor:
+            scc = list(executor.map(_sccOneChrom, tasks, chunksize=1))
+    else:
+        scc = list(map(_sccOneChrom, tasks))
+    return np.array(scc, dtype=float)
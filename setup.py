@@ -42,6 +42,7 @@ setuptools.setup(
         "pandas",
         "h5py",
     ],
+    extras_require={"numba": ["numba"]},
     entry_points={"console_scripts": ["hicrep=hicrep:main"]},
     data_files = [("", ["LICENSE.txt"])]
 )
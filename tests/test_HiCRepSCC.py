@@ -96,6 +96,14 @@ def testFlyHiC():
                          6.238132870270471e-01])
     assert np.isclose(results, expected).all()
 
+    # Test that computing the chromosomes in parallel gives the same results
+    resultsPar = hicrepSCC(cool1, cool2, h, dBPMax, bDownSample, nWorkers=2)
+    assert (results == resultsPar).all(), f"""
+        SCC scores between {fmcool1} and {fmcool2} computed with 2 workers
+        differ from those computed with a single process. The serial results
+        are {results} and the parallel results are {resultsPar}.
+        """
+
     # Test the computation of a subset of chromosomes give the same results as
     # the whole set
     chrNames = ['chr2L', 'chr2R', 'chrX']
@@ -11,6 +11,7 @@
 import numpy as np
 import scipy.sparse as sp
 from scipy.sparse import coo_matrix
+import hicrep.hicrep
 from hicrep.hicrep import (
     sccByDiag
     )
@@ -29,3 +30,15 @@ def testSccByDiag():
     assert scc < 1e-3 and scc > -1e-3,\
         f"sccByDiag returns SCC score significantly different than 0"\
         f"for two randomly populated matrices"
+
+
+def testSccByDiagNoNumba(monkeypatch):
+    m1 = sp.random(500, 500, density=0.2, format='coo')
+    m2 = sp.random(500, 500, density=0.2, format='coo')
+
+    scc = sccByDiag(m1, m2, m1.shape[0] - 3)
+    monkeypatch.setattr(hicrep.hicrep, "hasNumba", False)
+    sccNoNumba = sccByDiag(m1, m2, m1.shape[0] - 3)
+    # Test that the scipy fallback agrees with the numba kernel
+    assert np.isclose(scc, sccNoNumba),\
+        f"sccByDiag returns different SCC scores with and without numba"